@@ -60,8 +60,8 @@ def cleanup():
         f.write('{"portfolios": []}')
     with open("data/rates.json", "w") as f:
         f.write('{"pairs": {}, "last_refresh": null}')
-    with open("data/exchange_rates.json", "w") as f:
-        f.write('{"history": [], "last_updated": null}')
+    with open("data/exchange_rates.jsonl", "w") as f:
+        f.write("")
 
     print("Данные очищены ✓")
     time.sleep(1)
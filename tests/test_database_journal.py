@@ -0,0 +1,121 @@
+"""
+Тесты журнала портфелей DatabaseManager
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from valutatrade_hub.core.models import Portfolio
+from valutatrade_hub.infra import database
+from valutatrade_hub.infra.database import DatabaseManager
+from valutatrade_hub.infra.settings import SettingsLoader, Singleton
+
+
+class PortfolioJournalTest(unittest.TestCase):
+    """Воспроизведение, сворачивание и сброс журнала портфелей"""
+
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.mkdtemp()
+        os.chdir(self._tmp)
+        self.db = self._restart()
+        self.db.save_portfolios({1: Portfolio(1)})
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        shutil.rmtree(self._tmp)
+        self._reset_singletons()
+
+    @staticmethod
+    def _reset_singletons():
+        Singleton._instances.pop(SettingsLoader, None)
+        DatabaseManager._instance = None
+
+    def _restart(self) -> DatabaseManager:
+        """Имитирует новый процесс: сбрасывает singleton-ы и их кэши"""
+        self._reset_singletons()
+        return DatabaseManager()
+
+    def _deposit(self, db: DatabaseManager, amount: float):
+        with db.transaction(1) as tx:
+            wallet = tx.portfolio.get_wallet("BTC")
+            if wallet is None:
+                wallet = tx.portfolio.add_currency("BTC")
+            wallet.deposit(amount)
+            tx.dirty = True
+
+    def _balance(self, db: DatabaseManager) -> float:
+        wallet = db.load_portfolios()[1].get_wallet("BTC")
+        return wallet.balance if wallet else 0.0
+
+    @property
+    def journal_file(self) -> Path:
+        return SettingsLoader().portfolios_journal_file
+
+    def test_replay_after_restart(self):
+        self._deposit(self.db, 1.0)
+        self._deposit(self.db, 0.5)
+
+        self.assertTrue(self.journal_file.exists())
+        self.assertEqual(self._balance(self._restart()), 1.5)
+
+    def test_replay_survives_snapshot_mtime_change(self):
+        self._deposit(self.db, 1.0)
+
+        # touch/cp/восстановление из копии меняют только метаданные снимка
+        os.utime(SettingsLoader().portfolios_file, (0, 0))
+
+        self.assertEqual(self._balance(self._restart()), 1.0)
+
+    def test_append_after_torn_line(self):
+        self._deposit(self.db, 1.0)
+        self._deposit(self.db, 1.0)
+
+        # Сбой посреди дозаписи оставляет строку без перевода строки
+        with open(self.journal_file, "ab") as f:
+            f.write(b'{"user_id":1,"wal')
+        self._deposit(self.db, 5.0)
+
+        self.assertEqual(self._balance(self._restart()), 7.0)
+
+    def test_compaction_at_max_entries(self):
+        for _ in range(database._JOURNAL_MAX_ENTRIES):
+            self._deposit(self.db, 1.0)
+        self.assertTrue(self.journal_file.exists())
+
+        self._deposit(self.db, 1.0)
+
+        self.assertFalse(self.journal_file.exists())
+        self.assertEqual(self.db._journal_entries, 0)
+        expected = database._JOURNAL_MAX_ENTRIES + 1.0
+        self.assertEqual(self._balance(self._restart()), expected)
+
+    def test_journal_ignored_after_snapshot_rewrite(self):
+        self._deposit(self.db, 1.0)
+        stale_journal = self.journal_file.read_bytes()
+
+        # Полная перезапись снимка выдает новый snapshot_id
+        self.db.save_portfolios({1: Portfolio(1)})
+        self.journal_file.write_bytes(stale_journal)
+
+        with self.assertLogs(database.logger, "WARNING"):
+            self.assertEqual(self._balance(self._restart()), 0.0)
+
+    def test_snapshot_without_id_is_rewritten_before_journaling(self):
+        SettingsLoader().portfolios_file.write_text(
+            '{"portfolios": [{"user_id": 1, "wallets": {}}]}', encoding="utf-8"
+        )
+        db = self._restart()
+
+        self._deposit(db, 1.0)
+
+        self.assertFalse(self.journal_file.exists())
+        self.assertIsNotNone(db._snapshot_id)
+        self.assertEqual(self._balance(self._restart()), 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+Тесты переноса истории курсов в JSON Lines
+"""
+
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from valutatrade_hub.core import utils
+from valutatrade_hub.core.utils import (
+    append_json_line,
+    load_json_lines,
+    migrate_json_history,
+)
+
+
+class MigrateJsonHistoryTest(unittest.TestCase):
+    """Перенос {"history": [...]} из exchange_rates.json"""
+
+    def setUp(self):
+        self._tmp = tempfile.mkdtemp()
+        self.json_path = Path(self._tmp) / "exchange_rates.json"
+        self.lines_path = Path(self._tmp) / "exchange_rates.jsonl"
+        history = [{"id": "BTC_USD_1", "rate": 1.0}, {"id": "BTC_USD_2", "rate": 2.0}]
+        self.json_path.write_text(json.dumps({"history": history}), encoding="utf-8")
+
+    def tearDown(self):
+        shutil.rmtree(self._tmp)
+        utils._MIGRATED_HISTORY.discard(self.lines_path)
+
+    def test_converts_history_once(self):
+        self.assertEqual(migrate_json_history(self.lines_path), 2)
+        append_json_line(self.lines_path, {"id": "BTC_USD_3", "rate": 3.0})
+
+        # Повторный вызов в том же процессе не проверяет файлы заново
+        self.assertEqual(migrate_json_history(self.lines_path), 0)
+
+        # В новом процессе файл JSON Lines уже есть: записи не дублируются
+        utils._MIGRATED_HISTORY.discard(self.lines_path)
+        self.assertEqual(migrate_json_history(self.lines_path), 0)
+        ids = [record["id"] for record in load_json_lines(self.lines_path)]
+        self.assertEqual(ids, ["BTC_USD_1", "BTC_USD_2", "BTC_USD_3"])
+        self.assertTrue(self.json_path.exists())
+
+    def test_missing_legacy_file(self):
+        self.json_path.unlink()
+
+        self.assertEqual(migrate_json_history(self.lines_path), 0)
+        self.assertFalse(self.lines_path.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+"""
+Тесты моделей: хеширование паролей User и суммы операций Wallet
+"""
+
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+from valutatrade_hub.core import models
+from valutatrade_hub.core.models import User, Wallet
+from valutatrade_hub.infra.database import DatabaseManager
+from valutatrade_hub.infra.settings import SettingsLoader, Singleton
+
+# Рабочее значение запоминается до подмены в тестах
+_DEFAULT_ITERATIONS = models._PBKDF2_ITERATIONS
+# Быстрые параметры для тестов; схема и формат хеша те же
+_TEST_ITERATIONS = 1_000
+
+
+def _legacy_hash(password: str, salt: str) -> str:
+    """Хеш устаревшего формата: SHA-256 от пароля и соли"""
+    return hashlib.sha256((password + salt).encode("utf-8")).hexdigest()
+
+
+class PasswordHashingTest(unittest.TestCase):
+    """PBKDF2, устаревший SHA-256 и needs_rehash"""
+
+    def setUp(self):
+        patcher = mock.patch.object(models, "_PBKDF2_ITERATIONS", _TEST_ITERATIONS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_default_iterations_follow_owasp(self):
+        self.assertGreaterEqual(_DEFAULT_ITERATIONS, 600_000)
+
+    def test_pbkdf2_hash_and_verify(self):
+        user = User(1, "alice", "secret")
+
+        scheme, iterations, digest = user.hashed_password.split("$")
+        self.assertEqual(scheme, "pbkdf2_sha256")
+        self.assertEqual(int(iterations), _TEST_ITERATIONS)
+        self.assertEqual(len(bytes.fromhex(digest)), 32)
+        self.assertTrue(user.verify_password("secret"))
+        self.assertFalse(user.verify_password("wrong"))
+        self.assertFalse(user.needs_rehash())
+
+    def test_roundtrip_keeps_hash(self):
+        user = User.from_dict(User(1, "alice", "secret").to_dict())
+
+        self.assertTrue(user.verify_password("secret"))
+        self.assertFalse(user.verify_password("secreT"))
+
+    def test_legacy_sha256_verifies_and_needs_rehash(self):
+        salt = "f7aca778c84c5114"
+        user = User(1, "alice", None, salt, hashed_password=_legacy_hash("pw12", salt))
+
+        self.assertTrue(user.verify_password("pw12"))
+        self.assertFalse(user.verify_password("pw13"))
+        self.assertTrue(user.needs_rehash())
+
+        user.change_password("pw12")
+        self.assertTrue(user.hashed_password.startswith("pbkdf2_sha256$"))
+        self.assertTrue(user.verify_password("pw12"))
+        self.assertFalse(user.needs_rehash())
+
+    def test_old_iteration_count_needs_rehash(self):
+        with mock.patch.object(models, "_PBKDF2_ITERATIONS", 500):
+            data = User(1, "alice", "secret").to_dict()
+        user = User.from_dict(data)
+
+        self.assertTrue(user.verify_password("secret"))
+        self.assertTrue(user.needs_rehash())
+
+    def test_malformed_hash_loads_but_never_verifies(self):
+        data = User(1, "alice", "secret").to_dict()
+        for broken in ("not-hex", "pbkdf2_sha256$abc$00", "pbkdf2_sha256$0$00"):
+            data["hashed_password"] = broken
+            user = User.from_dict(data)
+
+            self.assertFalse(user.verify_password("secret"))
+            # Запись сохраняется без изменений и не теряется при записи
+            self.assertEqual(user.to_dict()["hashed_password"], broken)
+
+
+class LoginRehashTest(unittest.TestCase):
+    """Перевод хеша на актуальную схему при входе"""
+
+    def setUp(self):
+        patcher = mock.patch.object(models, "_PBKDF2_ITERATIONS", _TEST_ITERATIONS)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.mkdtemp()
+        os.chdir(self._tmp)
+        self._reset_singletons()
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        shutil.rmtree(self._tmp)
+        self._reset_singletons()
+
+    @staticmethod
+    def _reset_singletons():
+        Singleton._instances.pop(SettingsLoader, None)
+        DatabaseManager._instance = None
+
+    def test_login_rehashes_legacy_hash_and_saves(self):
+        # Импорт здесь: logging_config при импорте создает logs/ в текущем каталоге
+        from valutatrade_hub.core.usecases import UseCases
+
+        salt = "92574b51c47ebf5c"
+        legacy = User(1, "bob", None, salt, hashed_password=_legacy_hash("pw12", salt))
+        DatabaseManager().save_users({1: legacy})
+
+        UseCases().login_user("bob", "pw12")
+
+        self._reset_singletons()
+        stored = DatabaseManager().get_user_by_username("bob")
+        self.assertTrue(stored.hashed_password.startswith("pbkdf2_sha256$"))
+        self.assertEqual(stored.salt, salt)
+        self.assertTrue(stored.verify_password("pw12"))
+        self.assertFalse(stored.needs_rehash())
+
+
+class WalletAmountTest(unittest.TestCase):
+    """Проверка сумм пополнения и снятия"""
+
+    def test_accepts_real_and_decimal(self):
+        wallet = Wallet("USD", 10)
+        wallet.deposit(Decimal("1.5"))
+        wallet.withdraw(2)
+
+        self.assertEqual(wallet.balance, 9.5)
+
+    def test_rejects_non_numbers_and_non_finite(self):
+        wallet = Wallet("USD", 10)
+        for amount in ("1", None):
+            with self.assertRaises(TypeError):
+                wallet.deposit(amount)
+        for amount in (float("nan"), float("inf"), Decimal("Infinity")):
+            with self.assertRaises(ValueError):
+                wallet.withdraw(amount)
+        self.assertEqual(wallet.balance, 10.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -20,7 +20,6 @@ from ..core.exceptions import (
 )
 from ..core.usecases import UseCases
 from ..infra.database import DatabaseManager
-from ..parser_service.updater import RatesUpdater
 
 
 class CLI:
@@ -35,12 +34,9 @@ class CLI:
     def _load_session(self):
         """Загружает сессию из файла"""
         try:
-            if self.session_file.exists():
-                with open(self.session_file, "r", encoding="utf-8") as f:
-                    session = json.load(f)
-                    self.current_user = session.get("user_id")
-            else:
-                self.current_user = None
+            with open(self.session_file, "r", encoding="utf-8") as f:
+                session = json.load(f)
+                self.current_user = session.get("user_id")
         except (json.JSONDecodeError, IOError):
             self.current_user = None
 
@@ -56,8 +52,7 @@ class CLI:
     def _clear_session(self):
         """Очищает сессию"""
         try:
-            if self.session_file.exists():
-                os.remove(self.session_file)
+            os.remove(self.session_file)
         except OSError:
             pass
 
@@ -135,7 +130,6 @@ class CLI:
             table.align["Баланс"] = "r"
             table.align[f"Стоимость ({portfolio_info['base_currency']})"] = "r"
 
-            total = 0
             for wallet in portfolio_info["wallets"]:
                 if wallet["currency_code"] in ["BTC", "ETH"]:
                     balance_str = f"{wallet['balance']:.4f}"
@@ -143,10 +137,10 @@ class CLI:
                     balance_str = f"{wallet['balance']:.2f}"
                 value_str = f"{wallet['value_in_base']:.2f}"
                 table.add_row([wallet["currency_code"], balance_str, value_str])
-                total += wallet["value_in_base"]
 
             print(table)
             print("-" * 50)
+            total = portfolio_info["total_value"]
             print(f"ИТОГО: {total:,.2f} {portfolio_info['base_currency']}\n")
 
         except ValueError as e:
@@ -247,6 +241,9 @@ class CLI:
         """Обновляет курсы валют"""
         print("Запуск обновления курсов...")
 
+        # Парсер (и requests) нужен только этой команде, грузим лениво
+        from ..parser_service.updater import RatesUpdater
+
         try:
             # source = getattr(args, "source", "all")
             updater = RatesUpdater()
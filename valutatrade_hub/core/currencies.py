@@ -2,8 +2,10 @@
 Иерархия валют: Currency, FiatCurrency, CryptoCurrency
 """
 
+import functools
 from abc import ABC, abstractmethod
-from typing import Dict
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Mapping
 
 from .exceptions import CurrencyNotFoundError
 
@@ -69,13 +71,28 @@ class CryptoCurrency(Currency):
 
 # Реестр валют
 _CURRENCY_REGISTRY: Dict[str, Currency] = {}
+_CURRENCY_REGISTRY_VIEW: Mapping[str, Currency] = MappingProxyType(_CURRENCY_REGISTRY)
+
+# Коды валют (пересобираются при регистрации)
+_CURRENCY_CODES: FrozenSet[str] = frozenset()
+_CRYPTO_CODE_SET: FrozenSet[str] = frozenset()
 
 
 def register_currency(currency: Currency):
     """Регистрирует валюту в реестре"""
+    global _CURRENCY_CODES, _CRYPTO_CODE_SET
+
     _CURRENCY_REGISTRY[currency.code] = currency
+    _CURRENCY_CODES = frozenset(_CURRENCY_REGISTRY)
+    _CRYPTO_CODE_SET = frozenset(
+        code
+        for code, item in _CURRENCY_REGISTRY.items()
+        if isinstance(item, CryptoCurrency)
+    )
+    get_currency.cache_clear()
 
 
+@functools.lru_cache(maxsize=256)
 def get_currency(code: str) -> Currency:
     """Возвращает валюту по коду"""
     code = code.upper()
@@ -85,9 +102,19 @@ def get_currency(code: str) -> Currency:
     return currency
 
 
-def get_all_currencies() -> Dict[str, Currency]:
-    """Возвращает все зарегистрированные валюты"""
-    return _CURRENCY_REGISTRY.copy()
+def get_all_currencies() -> Mapping[str, Currency]:
+    """Возвращает все зарегистрированные валюты (только чтение)"""
+    return _CURRENCY_REGISTRY_VIEW
+
+
+def is_currency_registered(code: str) -> bool:
+    """Проверяет, зарегистрирована ли валюта"""
+    return code.upper() in _CURRENCY_CODES
+
+
+def is_crypto_currency(code: str) -> bool:
+    """Проверяет, является ли валюта зарегистрированной криптовалютой"""
+    return code in _CRYPTO_CODE_SET
 
 
 # Инициализация реестра с демонстрационными валютами
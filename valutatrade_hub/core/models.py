@@ -3,26 +3,78 @@
 """
 
 import hashlib
+import hmac
+import math
+import numbers
+import secrets
+import sys
 from datetime import datetime
-from typing import Any, Dict, Optional
+from decimal import Decimal
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+# Для демонстрации используем фиксированные курсы (ключ — пара валют)
+_DEMO_RATES: Dict[Tuple[str, str], float] = {
+    ("USD", "USD"): 1.0,
+    ("EUR", "USD"): 1.0786,
+    ("BTC", "USD"): 59337.21,
+    ("RUB", "USD"): 0.01016,
+    ("ETH", "USD"): 3720.00,
+    ("GBP", "USD"): 1.25,
+}
+
+
+def _demo_rate(currency_code: str, base_currency: str) -> float:
+    """Возвращает демонстрационный курс валюты к базовой (0.0, если курса нет)"""
+    if currency_code == base_currency:
+        return 1.0
+    rate = _DEMO_RATES.get((currency_code, base_currency))
+    if rate is None:
+        # Если курса нет, считаем по цепочке через USD
+        rate = _DEMO_RATES.get((currency_code, "USD"), 0.0)
+    return rate
+
+
+# Параметры хеширования паролей (PBKDF2-HMAC-SHA256 из hashlib/OpenSSL);
+# число итераций — по текущей рекомендации OWASP для PBKDF2-HMAC-SHA256
+_PBKDF2_SCHEME = "pbkdf2_sha256"
+_PBKDF2_ITERATIONS = 600_000
 
 
 class User:
     """Класс пользователя системы"""
 
+    __slots__ = (
+        "_user_id",
+        "_username",
+        "_salt",
+        "_salt_bytes",
+        "_hashed_password",
+        "_hash_iterations",
+        "_hash_digest",
+        "_registration_date",
+        "_registration_iso",
+    )
+
     def __init__(
         self,
         user_id: int,
         username: str,
-        password: str,
+        password: Optional[str],
         salt: Optional[str] = None,
         registration_date: Optional[datetime] = None,
+        hashed_password: Optional[str] = None,
     ):
         self._user_id = user_id
-        self._username = username
+        # Имя используется как ключ индекса — интернируем его
+        self._username = sys.intern(username)
         self._salt = salt or self._generate_salt()
-        self._hashed_password = self._hash_password(password, self._salt)
+        self._salt_bytes = self._salt.encode("utf-8")
+        # Готовый хеш (при загрузке из хранилища) не пересчитываем
+        self._set_hashed_password(hashed_password or self._hash_password(password))
         self._registration_date = registration_date or datetime.now()
+        # Дата регистрации неизменна — форматируем её один раз
+        self._registration_iso = self._registration_date.isoformat()
 
     @property
     def user_id(self) -> int:
@@ -36,7 +88,7 @@ class User:
     def username(self, value: str):
         if not value or not value.strip():
             raise ValueError("Имя пользователя не может быть пустым")
-        self._username = value.strip()
+        self._username = sys.intern(value.strip())
 
     @property
     def hashed_password(self) -> str:
@@ -51,35 +103,83 @@ class User:
         return self._registration_date
 
     def _generate_salt(self) -> str:
-        """Генерирует соль для хеширования пароля"""
-        import secrets
-
-        return secrets.token_hex(8)
-
-    def _hash_password(self, password: str, salt: str) -> str:
-        """Хеширует пароль с солью"""
+        """Генерирует соль для хеширования пароля (16 случайных байт в hex)"""
+        return secrets.token_bytes(16).hex()
+
+    def _set_hashed_password(self, hashed_password: str):
+        """Сохраняет хеш и заранее разбирает его параметры для проверки"""
+        self._hashed_password = hashed_password
+        self._hash_iterations: Optional[int] = None
+        self._hash_digest: Optional[bytes] = None
+        scheme, _, params = hashed_password.partition("$")
+        try:
+            if scheme == _PBKDF2_SCHEME:
+                iterations, _, digest_hex = params.partition("$")
+                self._hash_digest = bytes.fromhex(digest_hex)
+                self._hash_iterations = int(iterations)
+                if self._hash_iterations < 1:
+                    raise ValueError("Некорректное число итераций")
+            else:
+                # Устаревший формат: хеш целиком
+                self._hash_digest = bytes.fromhex(hashed_password)
+        except ValueError:
+            # Поврежденный хеш хранится как есть: пользователь загружается
+            # и не теряется при следующей записи, но войти с ним нельзя
+            self._hash_iterations = None
+            self._hash_digest = None
+
+    @staticmethod
+    def _check_password(password: str):
+        """Проверяет минимальную длину пароля"""
         if len(password) < 4:
             raise ValueError("Пароль должен быть не короче 4 символов")
 
-        # Простое хеширование для демонстрации
-        hash_input = (password + salt).encode("utf-8")
-        return hashlib.sha256(hash_input).hexdigest()
+    def _pbkdf2_digest(self, password: str, iterations: int) -> bytes:
+        """Вычисляет PBKDF2-HMAC-SHA256 от пароля с солью"""
+        self._check_password(password)
+        return hashlib.pbkdf2_hmac(
+            "sha256", password.encode("utf-8"), self._salt_bytes, iterations
+        )
+
+    def _legacy_digest(self, password: str) -> bytes:
+        """Хеш устаревшего формата (один проход SHA-256)"""
+        self._check_password(password)
+        # Два вызова update() вместо склейки пароля и соли в новый объект
+        hasher = hashlib.sha256(password.encode("utf-8"))
+        hasher.update(self._salt_bytes)
+        return hasher.digest()
+
+    def _hash_password(self, password: str) -> str:
+        """Хеширует пароль с солью (формат: схема$итерации$хеш)"""
+        digest = self._pbkdf2_digest(password, _PBKDF2_ITERATIONS)
+        return f"{_PBKDF2_SCHEME}${_PBKDF2_ITERATIONS}${digest.hex()}"
 
     def change_password(self, new_password: str):
         """Изменяет пароль пользователя"""
-        self._hashed_password = self._hash_password(new_password, self._salt)
+        self._set_hashed_password(self._hash_password(new_password))
 
     def verify_password(self, password: str) -> bool:
         """Проверяет введенный пароль"""
-        test_hash = self._hash_password(password, self._salt)
-        return test_hash == self._hashed_password
+        # Схема и параметры разобраны заранее в _set_hashed_password
+        if self._hash_digest is None:
+            return False
+        if self._hash_iterations is None:
+            test_digest = self._legacy_digest(password)
+        else:
+            test_digest = self._pbkdf2_digest(password, self._hash_iterations)
+        # Сравнение за постоянное время (без утечки по времени)
+        return hmac.compare_digest(test_digest, self._hash_digest)
+
+    def needs_rehash(self) -> bool:
+        """Проверяет, нужно ли пересчитать хеш (старый формат или параметры)"""
+        return self._hash_iterations != _PBKDF2_ITERATIONS
 
     def get_user_info(self) -> Dict[str, Any]:
         """Возвращает информацию о пользователе (без пароля)"""
         return {
             "user_id": self._user_id,
             "username": self._username,
-            "registration_date": self._registration_date.isoformat(),
+            "registration_date": self._registration_iso,
         }
 
     def to_dict(self) -> Dict[str, Any]:
@@ -89,27 +189,38 @@ class User:
             "username": self._username,
             "hashed_password": self._hashed_password,
             "salt": self._salt,
-            "registration_date": self._registration_date.isoformat(),
+            "registration_date": self._registration_iso,
         }
 
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "User":
         """Создает пользователя из словаря"""
-        user = cls(
+        return cls(
             user_id=data["user_id"],
             username=data["username"],
-            password="dummy_password",  # Любой пароль, он перезапишется
+            password=None,
             salt=data["salt"],
             registration_date=datetime.fromisoformat(data["registration_date"]),
+            hashed_password=data["hashed_password"],
         )
-        # Восстанавливаем сохраненный хэш
-        user._hashed_password = data["hashed_password"]
-        return user
+
+
+def _coerce_amount(amount: Any) -> float:
+    """Приводит сумму операции к float; Decimal принимается, как и раньше"""
+    if type(amount) is not float:
+        if not isinstance(amount, (numbers.Real, Decimal)):
+            raise TypeError("Сумма должна быть числом")
+        amount = float(amount)
+    if not math.isfinite(amount):
+        raise ValueError("Сумма должна быть конечным числом")
+    return amount
 
 
 class Wallet:
     """Кошелек пользователя для одной конкретной валюты"""
 
+    __slots__ = ("currency_code", "_balance")
+
     def __init__(self, currency_code: str, balance: float = 0.0):
         self.currency_code = currency_code
         self._balance = float(balance)
@@ -121,23 +232,27 @@ class Wallet:
     @balance.setter
     def balance(self, value: float):
         value = float(value)
+        if not math.isfinite(value):
+            raise ValueError("Баланс должен быть конечным числом")
         if value < 0:
             raise ValueError("Баланс не может быть отрицательным")
         self._balance = value
 
     def deposit(self, amount: float):
         """Пополнение баланса"""
+        amount = _coerce_amount(amount)
         if amount <= 0:
             raise ValueError("Сумма пополнения должна быть положительной")
-        self._balance += float(amount)
+        self._balance += amount
 
     def withdraw(self, amount: float):
         """Снятие средств"""
+        amount = _coerce_amount(amount)
         if amount <= 0:
             raise ValueError("Сумма снятия должна быть положительной")
         if amount > self._balance:
             raise ValueError(f"Недостаточно средств. Доступно: {self._balance}")
-        self._balance -= float(amount)
+        self._balance -= amount
 
     def get_balance_info(self) -> Dict[str, Any]:
         """Возвращает информацию о балансе"""
@@ -156,17 +271,22 @@ class Wallet:
 class Portfolio:
     """Управление всеми кошельками одного пользователя"""
 
+    __slots__ = ("_user_id", "_wallets", "_wallets_view")
+
     def __init__(self, user_id: int, wallets: Optional[Dict[str, Wallet]] = None):
         self._user_id = user_id
         self._wallets = wallets or {}
+        # Представление только для чтения, отражает изменения _wallets
+        self._wallets_view = MappingProxyType(self._wallets)
 
     @property
     def user_id(self) -> int:
         return self._user_id
 
     @property
-    def wallets(self) -> Dict[str, Wallet]:
-        return self._wallets.copy()
+    def wallets(self) -> Mapping[str, Wallet]:
+        """Кошельки портфеля (только чтение, изменения через add_currency)"""
+        return self._wallets_view
 
     def add_currency(self, currency_code: str) -> Wallet:
         """Добавляет новый кошелек в портфель"""
@@ -185,34 +305,14 @@ class Portfolio:
 
     def get_total_value(self, base_currency: str = "USD") -> float:
         """Возвращает общую стоимость всех валют в базовой валюте"""
-        # Для демонстрации используем фиксированные курсы
-        exchange_rates = {
-            "USD_USD": 1.0,
-            "EUR_USD": 1.0786,
-            "BTC_USD": 59337.21,
-            "RUB_USD": 0.01016,
-            "ETH_USD": 3720.00,
-            "GBP_USD": 1.25,
-        }
-
-        total = 0.0
         base_currency = base_currency.upper()
-
-        for wallet in self._wallets.values():
-            if wallet.currency_code == base_currency:
-                total += wallet.balance
-            else:
-                pair = f"{wallet.currency_code}_{base_currency}"
-                if pair in exchange_rates:
-                    total += wallet.balance * exchange_rates[pair]
-                else:
-                    # Если курса нет, считаем по цепочке через USD
-                    usd_pair = f"{wallet.currency_code}_USD"
-                    if usd_pair in exchange_rates:
-                        usd_value = wallet.balance * exchange_rates[usd_pair]
-                        total += usd_value
-
-        return total
+        return sum(
+            (
+                wallet.balance * _demo_rate(wallet.currency_code, base_currency)
+                for wallet in self._wallets.values()
+            ),
+            0.0,
+        )
 
     def to_dict(self) -> Dict[str, Any]:
         """Сериализует портфель в словарь"""
@@ -2,11 +2,12 @@
 Бизнес-логика приложения
 """
 
-from typing import Any, Dict
+from typing import Any, Dict, Optional, Tuple
 
 from ..decorators import log_action
 from ..infra.database import DatabaseManager
 from ..infra.settings import SettingsLoader
+from ..logging_config import logger
 from .currencies import get_currency
 from .exceptions import (
     ApiRequestError,
@@ -15,8 +16,57 @@ from .exceptions import (
     InsufficientFundsError,
     UserNotFoundError,
 )
-from .models import User
-from .utils import is_rate_fresh, validate_amount, validate_currency_code
+from .models import Portfolio, User
+from .utils import (
+    is_rate_fresh,
+    pair_key,
+    validate_amount,
+    validate_currency_code,
+)
+
+
+def _resolve_quote(
+    pairs: Dict[str, Any], from_currency: str, to_currency: str
+) -> Optional[Dict[str, Any]]:
+    """Находит курс пары: прямой, обратный или через USD (None, если нет)"""
+    # Ищем прямой курс
+    direct = pairs.get(pair_key(from_currency, to_currency))
+    if direct is not None:
+        return {
+            "from": from_currency,
+            "to": to_currency,
+            "rate": direct["rate"],
+            "updated_at": direct["updated_at"],
+            "source": direct.get("source", "unknown"),
+        }
+
+    # Ищем обратный курс
+    reverse = pairs.get(pair_key(to_currency, from_currency))
+    if reverse is not None:
+        return {
+            "from": from_currency,
+            "to": to_currency,
+            "rate": 1.0 / reverse["rate"],
+            "updated_at": reverse["updated_at"],
+            "source": reverse.get("source", "unknown"),
+        }
+
+    # Пробуем через USD
+    if from_currency != "USD" and to_currency != "USD":
+        from_usd = pairs.get(pair_key(from_currency, "USD"))
+        usd_to = pairs.get(pair_key("USD", to_currency))
+
+        if from_usd is not None and usd_to is not None:
+            return {
+                "from": from_currency,
+                "to": to_currency,
+                "rate": from_usd["rate"] * usd_to["rate"],
+                # Берем более свежее время обновления
+                "updated_at": max(from_usd["updated_at"], usd_to["updated_at"]),
+                "source": "calculated",
+            }
+
+    return None
 
 
 class UseCases:
@@ -25,6 +75,19 @@ class UseCases:
     def __init__(self):
         self.db = DatabaseManager()
         self.settings = SettingsLoader()
+        # Найденные курсы пар для текущего снимка rates.json
+        self._quotes: Dict[Tuple[str, str], Optional[Dict[str, Any]]] = {}
+        self._quotes_source: Optional[Dict[str, Any]] = None
+
+    def _usd_quote(
+        self, rates: Dict[str, Any], currency_code: str, amount: float
+    ) -> Tuple[Optional[float], Optional[float]]:
+        """Возвращает курс валюты к USD и стоимость суммы в USD (или None)"""
+        pairs = rates.get("pairs") or {}
+        info = pairs.get(pair_key(currency_code, "USD"))
+        if info is None:
+            return None, None
+        return info["rate"], amount * info["rate"]
 
     @log_action("REGISTER", verbose=True)
     def register_user(self, username: str, password: str) -> User:
@@ -60,6 +123,11 @@ class UseCases:
         if not user.verify_password(password):
             raise AuthenticationError()
 
+        # Переводим хеш старого формата на актуальную схему
+        if user.needs_rehash():
+            user.change_password(password)
+            self.db.save_user(user)
+
         return user
 
     @log_action("GET_PORTFOLIO", verbose=True)
@@ -72,55 +140,21 @@ class UseCases:
             raise ValueError("Портфель не найден")
 
         # Получаем пользователя для имени
-        users = self.db.load_users()
-        user = users.get(user_id)
+        user = self.db.get_user_by_id(user_id)
         username = user.username if user else f"user_{user_id}"
 
-        # Получаем текущие курсы
-        rates = self.db.load_rates()
-
-        # Рассчитываем стоимость каждого кошелька
-        wallet_values = []
-        total_value = 0.0
+        # Курсы всех валют к базовой, 0.0 если курс неизвестен
+        rates_to_base = self.db.get_rates_to_base(base_currency)
 
-        for currency_code, wallet in portfolio.wallets.items():
-            wallet_info = {
+        wallet_values = [
+            {
                 "currency_code": currency_code,
                 "balance": wallet.balance,
-                "value_in_base": 0.0,
+                "value_in_base": wallet.balance * rates_to_base.get(currency_code, 0.0),
             }
-
-            # Конвертируем в базовую валюту
-            if currency_code == base_currency:
-                value = wallet.balance
-            else:
-                pair = f"{currency_code}_{base_currency}"
-                if pair in rates.get("pairs", {}):
-                    rate = rates["pairs"][pair]["rate"]
-                    value = wallet.balance * rate
-                else:
-                    # Попробуем через USD
-                    usd_pair = f"{currency_code}_USD"
-                    if usd_pair in rates.get("pairs", {}):
-                        usd_rate = rates["pairs"][usd_pair]["rate"]
-                        usd_value = wallet.balance * usd_rate
-
-                        # Конвертируем USD в базовую валюту
-                        if base_currency != "USD":
-                            base_pair = f"USD_{base_currency}"
-                            if base_pair in rates.get("pairs", {}):
-                                base_rate = rates["pairs"][base_pair]["rate"]
-                                value = usd_value * base_rate
-                            else:
-                                value = 0.0
-                        else:
-                            value = usd_value
-                    else:
-                        value = 0.0
-
-            wallet_info["value_in_base"] = value
-            wallet_values.append(wallet_info)
-            total_value += value
+            for currency_code, wallet in portfolio.wallets.items()
+        ]
+        total_value = sum((info["value_in_base"] for info in wallet_values), 0.0)
 
         return {
             "user_id": user_id,
@@ -139,39 +173,31 @@ class UseCases:
         currency_code = validate_currency_code(currency_code)
         amount = validate_amount(amount)
 
-        # Получаем портфель пользователя
-        portfolio = self.db.get_portfolio_by_user_id(user_id)
-        if not portfolio:
-            portfolio = self.db.create_user_portfolio(user_id)
-
         # Проверяем наличие валюты в реестре
         try:
             currency = get_currency(currency_code)
-            print(f"Валюта: {currency}")
+            logger.debug("Валюта: %s", currency)
         except CurrencyNotFoundError:
             # Если валюта не найдена в реестре, все равно позволяем создать кошелек
             pass
 
-        # Создаем кошелек если не существует
-        wallet = portfolio.get_wallet(currency_code)
-        if not wallet:
-            wallet = portfolio.add_currency(currency_code)
-
-        # Пополняем кошелек
-        wallet.deposit(amount)
+        # Портфель и курсы читаются один раз, запись — одна при выходе
+        with self.db.transaction(user_id) as tx:
+            portfolio = tx.portfolio
+            if not portfolio:
+                portfolio = tx.portfolio = Portfolio(user_id)
 
-        # Получаем курс для расчета стоимости
-        rates = self.db.load_rates()
-        rate = None
-        cost_in_usd = None
+            # Создаем кошелек если не существует (код уже нормализован)
+            wallet = portfolio.wallets.get(currency_code)
+            if not wallet:
+                wallet = portfolio.add_currency(currency_code)
 
-        pair = f"{currency_code}_USD"
-        if "pairs" in rates and pair in rates["pairs"]:
-            rate = rates["pairs"][pair]["rate"]
-            cost_in_usd = amount * rate
+            # Пополняем кошелек
+            wallet.deposit(amount)
+            tx.dirty = True
 
-        # Сохраняем изменения
-        self.db.save_portfolio(portfolio)
+            # Получаем курс для расчета стоимости
+            rate, cost_in_usd = self._usd_quote(tx.rates, currency_code, amount)
 
         result = {
             "currency_code": currency_code,
@@ -192,38 +218,30 @@ class UseCases:
         currency_code = validate_currency_code(currency_code)
         amount = validate_amount(amount)
 
-        # Получаем портфель пользователя
-        portfolio = self.db.get_portfolio_by_user_id(user_id)
-        if not portfolio:
-            raise ValueError("Портфель не найден")
-
-        # Проверяем наличие кошелька
-        wallet = portfolio.get_wallet(currency_code)
-        if not wallet:
-            raise ValueError(f"У вас нет кошелька '{currency_code}'")
-
-        # Проверяем достаточность средств
-        if amount > wallet.balance:
-            raise InsufficientFundsError(
-                available=wallet.balance, required=amount, code=currency_code
-            )
-
-        # Снимаем средства
-        old_balance = wallet.balance
-        wallet.withdraw(amount)
-
-        # Получаем курс для расчета выручки
-        rates = self.db.load_rates()
-        rate = None
-        revenue_in_usd = None
+        # Портфель и курсы читаются один раз, запись — одна при выходе
+        with self.db.transaction(user_id) as tx:
+            portfolio = tx.portfolio
+            if not portfolio:
+                raise ValueError("Портфель не найден")
+
+            # Проверяем наличие кошелька (код уже нормализован)
+            wallet = portfolio.wallets.get(currency_code)
+            if not wallet:
+                raise ValueError(f"У вас нет кошелька '{currency_code}'")
+
+            # Проверяем достаточность средств
+            old_balance = wallet.balance
+            if amount > old_balance:
+                raise InsufficientFundsError(
+                    available=old_balance, required=amount, code=currency_code
+                )
 
-        pair = f"{currency_code}_USD"
-        if "pairs" in rates and pair in rates["pairs"]:
-            rate = rates["pairs"][pair]["rate"]
-            revenue_in_usd = amount * rate
+            # Снимаем средства
+            wallet.withdraw(amount)
+            tx.dirty = True
 
-        # Сохраняем изменения
-        self.db.save_portfolio(portfolio)
+            # Получаем курс для расчета выручки
+            rate, revenue_in_usd = self._usd_quote(tx.rates, currency_code, amount)
 
         result = {
             "currency_code": currency_code,
@@ -263,45 +281,20 @@ class UseCases:
         if not is_rate_fresh(last_refresh, self.settings.rates_ttl_seconds):
             raise ApiRequestError("Данные устарели. Выполните update-rates")
 
-        # Ищем прямой курс
-        pair = f"{from_currency}_{to_currency}"
-        if pair in pairs:
-            return {
-                "from": from_currency,
-                "to": to_currency,
-                "rate": pairs[pair]["rate"],
-                "updated_at": pairs[pair]["updated_at"],
-                "source": pairs[pair].get("source", "unknown"),
-            }
-
-        # Ищем обратный курс
-        reverse_pair = f"{to_currency}_{from_currency}"
-        if reverse_pair in pairs:
-            return {
-                "from": from_currency,
-                "to": to_currency,
-                "rate": 1.0 / pairs[reverse_pair]["rate"],
-                "updated_at": pairs[reverse_pair]["updated_at"],
-                "source": pairs[reverse_pair].get("source", "unknown"),
-            }
-
-        # Пробуем через USD
-        if from_currency != "USD" and to_currency != "USD":
-            usd_pair1 = f"{from_currency}_USD"
-            usd_pair2 = f"USD_{to_currency}"
-
-            if usd_pair1 in pairs and usd_pair2 in pairs:
-                rate = pairs[usd_pair1]["rate"] * pairs[usd_pair2]["rate"]
-                # Берем более свежее время обновления
-                updated_at = max(
-                    pairs[usd_pair1]["updated_at"], pairs[usd_pair2]["updated_at"]
-                )
-                return {
-                    "from": from_currency,
-                    "to": to_currency,
-                    "rate": rate,
-                    "updated_at": updated_at,
-                    "source": "calculated",
-                }
-
-        raise ApiRequestError(f"Не удалось получить курс {from_currency}→{to_currency}")
+        # Курсы пар не меняются до следующей загрузки rates.json
+        if rates is not self._quotes_source:
+            self._quotes = {}
+            self._quotes_source = rates
+
+        key = (from_currency, to_currency)
+        if key in self._quotes:
+            quote = self._quotes[key]
+        else:
+            quote = _resolve_quote(pairs, from_currency, to_currency)
+            self._quotes[key] = quote
+
+        if quote is None:
+            raise ApiRequestError(
+                f"Не удалось получить курс {from_currency}→{to_currency}"
+            )
+        return dict(quote)
@@ -2,37 +2,69 @@
 Вспомогательные функции
 """
 
+import functools
 import json
+import logging
+import math
+import mmap
+import os
+import sys
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, BinaryIO, Dict, List, Set
 
-from .currencies import get_currency
-from .exceptions import CurrencyNotFoundError
+from .currencies import is_crypto_currency, is_currency_registered
 
+try:
+    # Необязательное ускорение: orjson сериализует в C и сразу отдает UTF-8 байты
+    import orjson
+except ImportError:
+    orjson = None
 
+# Начиная с этого размера файл читается через mmap (меньше — дешевле read)
+_MMAP_MIN_SIZE = 64 * 1024
+
+if orjson is not None:
+    # Как в стандартном json: нестроковые ключи приводятся к строкам,
+    # а datetime сериализуется через default=str (а не в формате orjson)
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+logger = logging.getLogger(__name__)
+
+# Файлы истории, для которых перенос из JSON уже проверен в этом процессе
+_MIGRATED_HISTORY: Set[Path] = set()
+
+
+@functools.lru_cache(maxsize=256)
 def validate_currency_code(code: str) -> str:
     """Валидирует код валюты"""
     code = code.upper().strip()
     if not code:
         raise ValueError("Код валюты не может быть пустым")
 
-    # Попробуем найти валюту в реестре
-    try:
-        get_currency(code)
-    except CurrencyNotFoundError:
-        # Если не нашли, просто проверяем формат
+    # Если валюты нет в реестре, просто проверяем формат
+    if not is_currency_registered(code):
         if not (2 <= len(code) <= 5):
             raise ValueError("Код валюты должен содержать от 2 до 5 символов")
         if " " in code:
             raise ValueError("Код валюты не должен содержать пробелы")
 
-    return code
+    # Интернируем код: ключи пар и словарей сравниваются по ссылке
+    return sys.intern(code)
+
+
+@functools.lru_cache(maxsize=4096)
+def pair_key(from_code: str, to_code: str) -> str:
+    """Возвращает интернированный ключ пары валют вида 'BTC_USD'"""
+    return sys.intern(f"{from_code}_{to_code}")
 
 
 def validate_amount(amount: float) -> float:
     """Валидирует сумму"""
     amount = float(amount)
+    # NaN и бесконечность не сравниваются с нулем как обычные числа
+    if not math.isfinite(amount):
+        raise ValueError("Сумма должна быть конечным числом")
     if amount <= 0:
         raise ValueError("Сумма должна быть положительным числом")
     return amount
@@ -41,31 +73,180 @@ def validate_amount(amount: float) -> float:
 def load_json_file(file_path: Path) -> Dict[str, Any]:
     """Загружает JSON файл"""
     try:
-        if file_path.exists():
-            with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-    except (json.JSONDecodeError, IOError):
+        with open(file_path, "rb") as f:
+            # Большие файлы orjson разбирает прямо из отображения в память
+            size = os.fstat(f.fileno()).st_size
+            if orjson is not None and size >= _MMAP_MIN_SIZE:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    with memoryview(mm) as view:
+                        return orjson.loads(view)
+            raw = f.read()
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw)
+    except (json.JSONDecodeError, UnicodeDecodeError, IOError):
         pass
     return {}
 
 
-def save_json_file(file_path: Path, data: Dict[str, Any]):
-    """Сохраняет данные в JSON файл"""
+def save_json_file(file_path: Path, data: Dict[str, Any], indent: bool = True):
+    """
+    Сохраняет данные в JSON файл
+
+    indent=False пишет компактный JSON — для больших файлов, которые
+    читает программа, а не человек.
+
+    NaN и бесконечность не записываются: orjson сохранил бы их как null,
+    поэтому и стандартный json отказывается их сериализовать.
+    """
     # Создаем директорию если не существует
     file_path.parent.mkdir(exist_ok=True)
 
-    # Сохраняем во временный файл, затем переименовываем
+    if orjson is not None:
+        option = _ORJSON_OPTIONS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        payload = orjson.dumps(data, option=option, default=str)
+    else:
+        if indent:
+            text = json.dumps(
+                data, ensure_ascii=False, indent=2, default=str, allow_nan=False
+            )
+        else:
+            text = json.dumps(
+                data,
+                ensure_ascii=False,
+                separators=(",", ":"),
+                default=str,
+                allow_nan=False,
+            )
+        payload = text.encode("utf-8")
+
+    # Сохраняем во временный файл, сбрасываем на диск, затем атомарно заменяем
     temp_path = file_path.with_suffix(".tmp")
-    with open(temp_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    with open(temp_path, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(temp_path, file_path)
+
+
+def load_json_lines(file_path: Path) -> List[Dict[str, Any]]:
+    """Загружает записи из файла JSON Lines (битые строки пропускаются)"""
+    records = []
+    try:
+        with open(file_path, "rb") as f:
+            for line in f:
+                try:
+                    if orjson is not None:
+                        records.append(orjson.loads(line))
+                    else:
+                        records.append(json.loads(line))
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    # Недописанная строка после сбоя
+                    continue
+    except IOError:
+        pass
+    return records
+
+
+def _dump_json_line(record: Dict[str, Any]) -> bytes:
+    """Сериализует запись в одну строку JSON Lines (с переводом строки)"""
+    if orjson is not None:
+        payload = orjson.dumps(record, option=_ORJSON_OPTIONS, default=str)
+    else:
+        text = json.dumps(
+            record,
+            ensure_ascii=False,
+            separators=(",", ":"),
+            default=str,
+            allow_nan=False,
+        )
+        payload = text.encode("utf-8")
+    return payload + b"\n"
+
+
+def _drop_torn_tail(f: BinaryIO) -> None:
+    """
+    Обрезает недописанную последнюю строку (без перевода строки)
+
+    После сбоя во время дозаписи файл может заканчиваться обрывком
+    записи; без обрезки следующая запись склеилась бы с ним в одну
+    нечитаемую строку и тоже потерялась бы.
+    """
+    end = f.seek(0, os.SEEK_END)
+    if end == 0:
+        return
+    f.seek(end - 1)
+    if f.read(1) == b"\n":
+        return
+
+    # Ищем конец последней целой строки, читая файл с конца блоками
+    pos = end
+    while pos > 0:
+        start = max(0, pos - 4096)
+        f.seek(start)
+        newline = f.read(pos - start).rfind(b"\n")
+        if newline != -1:
+            f.truncate(start + newline + 1)
+            return
+        pos = start
+    f.truncate(0)
+
+
+def append_json_line(file_path: Path, record: Dict[str, Any]):
+    """Дописывает одну запись в конец файла JSON Lines"""
+    file_path.parent.mkdir(exist_ok=True)
+
+    with open(file_path, "ab+") as f:
+        _drop_torn_tail(f)
+        f.write(_dump_json_line(record))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def migrate_json_history(lines_path: Path) -> int:
+    """
+    Переносит историю {"history": [...]} из одноименного .json в JSON Lines
+
+    Выполняется, только пока файла JSON Lines нет, и проверяется один раз
+    за процесс, поэтому повторный вызов ничего не делает. Старый файл
+    остается на месте. Возвращает число перенесенных записей.
+    """
+    if lines_path in _MIGRATED_HISTORY:
+        return 0
+    _MIGRATED_HISTORY.add(lines_path)
+    if lines_path.exists():
+        return 0
+
+    json_path = lines_path.with_suffix(".json")
+    records = load_json_file(json_path).get("history") or []
+    if not records:
+        return 0
+
+    # Атомарно, как save_json_file: частично перенесенной истории не будет
+    temp_path = lines_path.with_suffix(".tmp")
+    with open(temp_path, "wb") as f:
+        f.write(b"".join(_dump_json_line(record) for record in records))
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(temp_path, lines_path)
+    logger.info("История курсов перенесена в %s: %s записей", lines_path, len(records))
+    return len(records)
+
 
-    temp_path.rename(file_path)
+@functools.lru_cache(maxsize=256)
+def _parse_timestamp(value: str) -> datetime:
+    """Разбирает ISO-время (результат кэшируется: отметки курсов повторяются)"""
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
 
 
 def is_rate_fresh(updated_at: str, ttl_seconds: int) -> bool:
     """Проверяет, не устарел ли курс"""
     try:
-        update_time = datetime.fromisoformat(updated_at.replace("Z", "+00:00"))
+        update_time = _parse_timestamp(updated_at)
         now = datetime.now(update_time.tzinfo) if update_time.tzinfo else datetime.now()
         age = now - update_time
         return age.total_seconds() < ttl_seconds
@@ -75,7 +256,7 @@ def is_rate_fresh(updated_at: str, ttl_seconds: int) -> bool:
 
 def format_currency_value(value: float, currency_code: str) -> str:
     """Форматирует денежное значение"""
-    if currency_code in ["BTC", "ETH", "SOL"]:
+    if is_crypto_currency(currency_code):
         # Криптовалюты - больше знаков после запятой
         return f"{value:.6f} {currency_code}"
     else:
@@ -3,12 +3,62 @@
 """
 
 import functools
+import inspect
+import logging
 from datetime import datetime
-from typing import Callable
+from typing import Any, Callable, Dict, Optional
 
 from .infra.database import DatabaseManager
 from .logging_config import logger
 
+# Именованные аргументы, попадающие в лог (в этом порядке)
+_LOGGED_KWARGS = ("currency_code", "amount", "rate", "base")
+
+
+def _user_id_position(func: Callable) -> Optional[int]:
+    """Позиция параметра user_id в сигнатуре функции (None, если его нет)"""
+    for position, name in enumerate(inspect.signature(func).parameters):
+        if name == "user_id":
+            return position
+    return None
+
+
+def _extract_user_id(
+    position: Optional[int], args: tuple, kwargs: dict
+) -> Optional[int]:
+    """Извлекает user_id из аргументов вызова"""
+    if position is not None and position < len(args):
+        return args[position]
+    return kwargs.get("user_id")
+
+
+def _build_log_data(
+    action: str,
+    user_id: Optional[int],
+    username: Optional[str],
+    result: str,
+    kwargs: dict,
+    error: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
+    """Собирает запись лога, общую для успешных и неудачных действий"""
+    log_data = {
+        "action": action,
+        "user_id": user_id,
+        "username": username,
+        "result": result,
+    }
+    if error is not None:
+        log_data["error"] = error
+    log_data["timestamp"] = datetime.now().isoformat()
+
+    # Добавляем дополнительные поля из kwargs
+    if kwargs:
+        for key in _LOGGED_KWARGS:
+            if key in kwargs:
+                log_data[key] = kwargs[key]
+
+    return log_data
+
 
 def log_action(action: str, verbose: bool = False):
     """
@@ -20,89 +70,52 @@ def log_action(action: str, verbose: bool = False):
     """
 
     def decorator(func: Callable) -> Callable:
+        # Позиция user_id определяется один раз при декорировании
+        user_id_position = _user_id_position(func)
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            # Пытаемся извлечь информацию о пользователе
-            user_id = None
-            username = None
-            result = "OK"
-            error_info = None
-            # additional_info = ""
-
             try:
-                # Извлекаем user_id из аргументов
-                for arg in args:
-                    if isinstance(arg, int) and arg > 0:
-                        user_id = arg
-                        break
-
-                # Или из kwargs
-                if not user_id:
-                    user_id = kwargs.get("user_id")
-
-                # Получаем имя пользователя по ID
-                if user_id:
-                    db = DatabaseManager()
-                    users = db.load_users()
-                    user = users.get(user_id)
-                    if user:
-                        username = user.username
-
                 # Выполняем функцию
                 result_value = func(*args, **kwargs)
-
-                # Логируем успешное выполнение
-                log_data = {
-                    "action": action,
-                    "user_id": user_id,
-                    "username": username,
-                    "result": result,
-                    "timestamp": datetime.now().isoformat(),
-                }
-
-                # Добавляем дополнительные поля из kwargs
-                for key in ["currency_code", "amount", "rate", "base"]:
-                    if key in kwargs:
-                        log_data[key] = kwargs[key]
-
-                # Если нужно подробное логирование
-                if verbose and user_id:
-                    db = DatabaseManager()
-                    portfolio = db.get_portfolio_by_user_id(user_id)
-                    if portfolio:
-                        wallets_info = {
-                            code: wallet.balance
-                            for code, wallet in portfolio.wallets.items()
-                        }
-                        log_data["wallets_state"] = wallets_info
-
-                logger.info(f"Action logged: {log_data}")
-
-                return result_value
-
             except Exception as e:
                 # Логируем ошибку
-                result = "ERROR"
-                error_info = {"type": e.__class__.__name__, "message": str(e)}
+                if logger.isEnabledFor(logging.ERROR):
+                    user_id = _extract_user_id(user_id_position, args, kwargs)
+                    username = (
+                        DatabaseManager().get_username(user_id) if user_id else None
+                    )
+                    error_info = {"type": e.__class__.__name__, "message": str(e)}
+                    log_data = _build_log_data(
+                        action, user_id, username, "ERROR", kwargs, error_info
+                    )
+                    logger.error("Action failed: %s", log_data)
+
+                # Пробрасываем исключение дальше
+                raise
 
-                log_data = {
-                    "action": action,
-                    "user_id": user_id,
-                    "username": username,
-                    "result": result,
-                    "error": error_info,
-                    "timestamp": datetime.now().isoformat(),
-                }
+            # Данные для лога собираем, только если INFO будет записан
+            if logger.isEnabledFor(logging.INFO):
+                user_id = _extract_user_id(user_id_position, args, kwargs)
 
-                # Добавляем дополнительные поля из kwargs
-                for key in ["currency_code", "amount", "rate", "base"]:
-                    if key in kwargs:
-                        log_data[key] = kwargs[key]
+                # Имя пользователя (и для verbose — состояние кошельков)
+                username = None
+                wallets_info = None
+                if user_id:
+                    # Singleton берется при вызове: его могли пересоздать
+                    db = DatabaseManager()
+                    if verbose:
+                        username, wallets_info = db.get_user_context(user_id)
+                    else:
+                        username = db.get_username(user_id)
 
-                logger.error(f"Action failed: {log_data}")
+                log_data = _build_log_data(action, user_id, username, "OK", kwargs)
+                if wallets_info is not None:
+                    log_data["wallets_state"] = wallets_info
 
-                # Пробрасываем исключение дальше
-                raise
+                logger.info("Action logged: %s", log_data)
+
+            return result_value
 
         return wrapper
 
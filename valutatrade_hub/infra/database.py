@@ -2,32 +2,104 @@
 Singleton для управления JSON-хранилищем
 """
 
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+import logging
+import secrets
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from ..core.models import Portfolio, User
-from ..core.utils import load_json_file, save_json_file
+from ..core.utils import (
+    append_json_line,
+    load_json_file,
+    load_json_lines,
+    migrate_json_history,
+    save_json_file,
+)
 from .settings import SettingsLoader
 
+logger = logging.getLogger(__name__)
+
+# После стольких записей журнал сворачивается в portfolios.json
+_JOURNAL_MAX_ENTRIES = 50
+
+
+def _file_mtime(path: Path) -> Optional[int]:
+    """Возвращает время изменения файла в наносекундах (None, если файла нет)"""
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+class Transaction:
+    """Снимок данных пользователя в рамках одной операции"""
+
+    def __init__(
+        self, user_id: int, portfolio: Optional[Portfolio], rates: Dict[str, Any]
+    ):
+        self.user_id = user_id
+        self.portfolio = portfolio
+        self.rates = rates
+        # Портфель изменен и должен быть записан при завершении
+        self.dirty = False
+
 
 class DatabaseManager:
     """Менеджер базы данных (Singleton)"""
 
     _instance = None
+    _lock = threading.Lock()
 
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._initialized = False
+            with cls._lock:
+                # Повторная проверка: экземпляр мог создать другой поток
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance._initialized = False
+                    cls._instance = instance
         return cls._instance
 
     def __init__(self):
         if not self._initialized:
             self.settings = SettingsLoader()
+            # Кэш пользователей, сверяется с mtime файла
+            self._users_cache: Optional[Dict[int, User]] = None
+            self._users_mtime: Optional[int] = None
+            self._username_index: Dict[str, int] = {}
+            self._next_user_id = 1
+            # Кэш портфелей для чтения, сверяется с mtime снимка и журнала
+            self._portfolios_cache: Optional[Dict[int, Portfolio]] = None
+            self._portfolios_mtime: Optional[Tuple[Optional[int], ...]] = None
+            # Идентификатор снимка portfolios.json, на который ссылается журнал
+            self._snapshot_id: Optional[str] = None
+            # Число записей в журнале портфелей поверх текущего снимка
+            self._journal_entries = 0
+            # Кэш курсов и таблица {(из, в): курс}, пересобираемая при обновлении
+            self._rates_cache: Optional[Dict[str, Any]] = None
+            self._rates_mtime: Optional[int] = None
+            self._rate_table: Optional[Dict[Tuple[str, str], float]] = None
+            self._base_rate_tables: Dict[str, Dict[str, float]] = {}
             self._initialized = True
 
-    def load_users(self) -> Dict[int, User]:
-        """Загружает всех пользователей"""
+    def _set_users_cache(self, users: Dict[int, User]):
+        """Обновляет кэш пользователей и индекс по имени"""
+        self._users_cache = users
+        self._users_mtime = _file_mtime(self.settings.users_file)
+        self._username_index = {
+            user.username: user_id for user_id, user in users.items()
+        }
+        # Счетчик ID считается один раз при обновлении кэша
+        self._next_user_id = max(users, default=0) + 1
+
+    def _get_users(self) -> Dict[int, User]:
+        """Возвращает кэш пользователей, перечитывая файл при его изменении"""
+        mtime = _file_mtime(self.settings.users_file)
+        if self._users_cache is not None and mtime == self._users_mtime:
+            return self._users_cache
+
         data = load_json_file(self.settings.users_file)
         users = {}
 
@@ -36,14 +108,47 @@ class DatabaseManager:
                 user = User.from_dict(user_data)
                 users[user.user_id] = user
             except Exception as e:
-                print(f"Ошибка загрузки пользователя: {e}")
+                logger.error("Ошибка загрузки пользователя: %s", e)
 
+        self._set_users_cache(users)
         return users
 
+    def load_users(self) -> Dict[int, User]:
+        """Загружает всех пользователей"""
+        return dict(self._get_users())
+
     def save_users(self, users: Dict[int, User]):
         """Сохраняет всех пользователей"""
         data = {"users": [user.to_dict() for user in users.values()]}
-        save_json_file(self.settings.users_file, data)
+        save_json_file(self.settings.users_file, data, indent=False)
+        self._set_users_cache(dict(users))
+
+    def _portfolios_version(self) -> Tuple[Optional[int], ...]:
+        """Версия данных портфелей: mtime снимка и журнала"""
+        return (
+            _file_mtime(self.settings.portfolios_file),
+            _file_mtime(self.settings.portfolios_journal_file),
+        )
+
+    def _set_portfolios_cache(self, portfolios: Dict[int, Portfolio]):
+        """Обновляет кэш портфелей после записи"""
+        self._portfolios_cache = dict(portfolios)
+        self._portfolios_mtime = self._portfolios_version()
+
+    def _get_portfolios(self) -> Dict[int, Portfolio]:
+        """
+        Возвращает кэш портфелей только для чтения
+
+        Для изменения портфелей используйте load_portfolios: он возвращает
+        свежие объекты, и неудачная операция не испортит кэш.
+        """
+        version = self._portfolios_version()
+        if self._portfolios_cache is not None and version == self._portfolios_mtime:
+            return self._portfolios_cache
+
+        self._portfolios_cache = self.load_portfolios()
+        self._portfolios_mtime = version
+        return self._portfolios_cache
 
     def load_portfolios(self) -> Dict[int, Portfolio]:
         """Загружает все портфели"""
@@ -55,57 +160,203 @@ class DatabaseManager:
                 portfolio = Portfolio.from_dict(portfolio_data)
                 portfolios[portfolio.user_id] = portfolio
             except Exception as e:
-                print(f"Ошибка загрузки портфеля: {e}")
+                logger.error("Ошибка загрузки портфеля: %s", e)
 
+        self._snapshot_id = data.get("snapshot_id")
+        self._journal_entries = self._replay_journal(portfolios)
         return portfolios
 
     def save_portfolios(self, portfolios: Dict[int, Portfolio]):
         """Сохраняет все портфели"""
+        # Новый идентификатор делает недействительным журнал к прошлому снимку
+        snapshot_id = secrets.token_hex(8)
         data = {
-            "portfolios": [portfolio.to_dict() for portfolio in portfolios.values()]
+            "snapshot_id": snapshot_id,
+            "portfolios": [portfolio.to_dict() for portfolio in portfolios.values()],
         }
-        save_json_file(self.settings.portfolios_file, data)
+        save_json_file(self.settings.portfolios_file, data, indent=False)
+
+        # Снимок содержит все изменения, журнал больше не нужен
+        self.settings.portfolios_journal_file.unlink(missing_ok=True)
+        self._snapshot_id = snapshot_id
+        self._journal_entries = 0
+        self._set_portfolios_cache(portfolios)
+
+    def _replay_journal(self, portfolios: Dict[int, Portfolio]) -> int:
+        """
+        Применяет журнал изменений к портфелям, возвращает число записей
+
+        Первая строка журнала хранит snapshot_id снимка, к которому он
+        относится. Если снимок с тех пор перезаписан (другой snapshot_id),
+        журнал устарел и игнорируется.
+        """
+        records = load_json_lines(self.settings.portfolios_journal_file)
+        if not records:
+            return 0
+
+        journal_id = records[0].get("snapshot_id")
+        if journal_id is None or journal_id != self._snapshot_id:
+            logger.warning(
+                "Журнал портфелей относится к другому снимку (%s, ожидался %s), "
+                "пропущено записей: %s",
+                journal_id,
+                self._snapshot_id,
+                len(records) - 1,
+            )
+            return 0
+
+        for portfolio_data in records[1:]:
+            try:
+                portfolio = Portfolio.from_dict(portfolio_data)
+                portfolios[portfolio.user_id] = portfolio
+            except Exception as e:
+                logger.error("Ошибка загрузки портфеля из журнала: %s", e)
+
+        return len(records) - 1
+
+    def _journal_portfolio(
+        self, portfolios: Dict[int, Portfolio], portfolio: Portfolio
+    ):
+        """
+        Дописывает портфель в журнал вместо перезаписи всех портфелей
+
+        portfolios — результат последнего load_portfolios с уже внесенным
+        портфелем; используется при сворачивании журнала в снимок.
+        """
+        # Снимок без snapshot_id (старый формат) сначала переписывается целиком
+        if self._journal_entries >= _JOURNAL_MAX_ENTRIES or self._snapshot_id is None:
+            self.save_portfolios(portfolios)
+            return
+
+        journal_file = self.settings.portfolios_journal_file
+        if self._journal_entries == 0:
+            # Начинаем новый журнал поверх текущего снимка
+            journal_file.unlink(missing_ok=True)
+            append_json_line(journal_file, {"snapshot_id": self._snapshot_id})
+
+        append_json_line(journal_file, portfolio.to_dict())
+        self._journal_entries += 1
+        self._set_portfolios_cache(portfolios)
 
     def load_rates(self) -> Dict[str, Any]:
-        """Загружает курсы валют"""
-        return load_json_file(self.settings.rates_file)
+        """Загружает курсы валют (кэшируется до изменения файла, не изменять)"""
+        mtime = _file_mtime(self.settings.rates_file)
+        if self._rates_cache is None or mtime != self._rates_mtime:
+            self._rates_cache = load_json_file(self.settings.rates_file)
+            self._rates_mtime = mtime
+            self._rate_table = None
+            self._base_rate_tables = {}
+        return self._rates_cache
 
     def save_rates(self, rates: Dict[str, Any]):
         """Сохраняет курсы валют"""
         save_json_file(self.settings.rates_file, rates)
+        self._rates_cache = rates
+        self._rates_mtime = _file_mtime(self.settings.rates_file)
+        self._rate_table = None
+        self._base_rate_tables = {}
+
+    def get_rate_table(self) -> Dict[Tuple[str, str], float]:
+        """Возвращает курсы в виде {(из, в): курс} (только чтение)"""
+        rates = self.load_rates()
+        if self._rate_table is None:
+            table = {}
+            for pair, info in (rates.get("pairs") or {}).items():
+                from_code, _, to_code = pair.partition("_")
+                table[(from_code, to_code)] = info["rate"]
+            self._rate_table = table
+        return self._rate_table
+
+    def get_rates_to_base(self, base_currency: str) -> Dict[str, float]:
+        """
+        Возвращает курсы всех валют к базовой в виде {код: курс} (только чтение)
+
+        Прямой курс имеет приоритет, иначе курс считается через USD.
+        Таблица строится один раз на каждую версию курсов.
+        """
+        rate_table = self.get_rate_table()
+        table = self._base_rate_tables.get(base_currency)
+        if table is not None:
+            return table
+
+        table = {
+            from_code: rate
+            for (from_code, to_code), rate in rate_table.items()
+            if to_code == base_currency
+        }
+
+        # Пересчет через USD для валют без прямого курса
+        usd_to_base = rate_table.get(("USD", base_currency))
+        if base_currency != "USD" and usd_to_base is not None:
+            for (from_code, to_code), rate in rate_table.items():
+                if to_code == "USD":
+                    table.setdefault(from_code, rate * usd_to_base)
+
+        table[base_currency] = 1.0
+        self._base_rate_tables[base_currency] = table
+        return table
 
     def load_exchange_rates(self) -> List[Dict[str, Any]]:
         """Загружает исторические курсы"""
-        data = load_json_file(self.settings.exchange_rates_file)
-        return data.get("history", [])
+        migrate_json_history(self.settings.exchange_rates_file)
+        return load_json_lines(self.settings.exchange_rates_file)
 
     def save_exchange_rate(self, rate_record: Dict[str, Any]):
-        """Сохраняет одну запись исторического курса"""
-        history = self.load_exchange_rates()
-        history.append(rate_record)
+        """Дописывает одну запись исторического курса в конец истории"""
+        migrate_json_history(self.settings.exchange_rates_file)
+        append_json_line(self.settings.exchange_rates_file, rate_record)
 
-        data = {"history": history, "last_updated": datetime.now().isoformat()}
-        save_json_file(self.settings.exchange_rates_file, data)
+    @contextmanager
+    def transaction(self, user_id: int) -> Iterator[Transaction]:
+        """
+        Читает портфели и курсы один раз и записывает портфель один раз
+
+        Изменения сохраняются, только если блок завершился без исключения
+        и транзакция помечена как измененная (dirty).
+        """
+        portfolios = self.load_portfolios()
+        tx = Transaction(user_id, portfolios.get(user_id), self.load_rates())
+
+        yield tx
+
+        if tx.dirty and tx.portfolio is not None:
+            portfolios[user_id] = tx.portfolio
+            self._journal_portfolio(portfolios, tx.portfolio)
 
     def get_next_user_id(self) -> int:
         """Генерирует следующий ID пользователя"""
-        users = self.load_users()
-        if not users:
-            return 1
-        return max(users.keys()) + 1
+        self._get_users()
+        return self._next_user_id
+
+    def get_user_by_id(self, user_id: int) -> Optional[User]:
+        """Находит пользователя по ID"""
+        return self._get_users().get(user_id)
+
+    def get_username(self, user_id: int) -> Optional[str]:
+        """Возвращает имя пользователя по ID"""
+        user = self._get_users().get(user_id)
+        return user.username if user else None
+
+    def get_user_context(
+        self, user_id: int
+    ) -> Tuple[Optional[str], Optional[Dict[str, float]]]:
+        """Возвращает имя пользователя и балансы его кошельков из кэшей"""
+        username = self.get_username(user_id)
+        portfolio = self._get_portfolios().get(user_id)
+        if portfolio is None:
+            return username, None
+        wallets = {code: wallet.balance for code, wallet in portfolio.wallets.items()}
+        return username, wallets
 
     def get_user_by_username(self, username: str) -> Optional[User]:
         """Находит пользователя по имени"""
-        users = self.load_users()
-        for user in users.values():
-            if user.username == username:
-                return user
-        return None
+        users = self._get_users()
+        user_id = self._username_index.get(username)
+        return users.get(user_id) if user_id is not None else None
 
     def get_portfolio_by_user_id(self, user_id: int) -> Optional[Portfolio]:
-        """Находит портфель по ID пользователя"""
-        portfolios = self.load_portfolios()
-        return portfolios.get(user_id)
+        """Находит портфель по ID пользователя (только для чтения)"""
+        return self._get_portfolios().get(user_id)
 
     def save_user(self, user: User):
         """Сохраняет пользователя"""
@@ -3,10 +3,24 @@ Singleton для загрузки конфигурации
 """
 
 import json
+import logging
 from pathlib import Path
 from typing import Any, Optional
 
-import toml
+try:
+    # tomllib входит в стандартную библиотеку с Python 3.11 и быстрее toml
+    import tomllib
+except ImportError:
+    tomllib = None
+    import toml
+
+try:
+    # Необязательное ускорение разбора JSON-конфигурации
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
 
 
 class Singleton(type):
@@ -15,14 +29,28 @@ class Singleton(type):
     _instances = {}
 
     def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            cls._instances[cls] = super().__call__(*args, **kwargs)
-        return cls._instances[cls]
+        # Повторные вызовы — один поиск в словаре, __init__ не вызывается
+        try:
+            return cls._instances[cls]
+        except KeyError:
+            instance = cls._instances[cls] = super().__call__(*args, **kwargs)
+            return instance
 
 
 class SettingsLoader(metaclass=Singleton):
     """Загрузчик конфигурации (Singleton)"""
 
+    __slots__ = (
+        "_config_path",
+        "_config",
+        "_data_dir",
+        "_users_file",
+        "_portfolios_file",
+        "_portfolios_journal_file",
+        "_rates_file",
+        "_exchange_rates_file",
+    )
+
     def __init__(self, config_path: Optional[Path] = None):
         self._config_path = config_path or Path("pyproject.toml")
         self._config = {}
@@ -31,15 +59,25 @@ class SettingsLoader(metaclass=Singleton):
     def _load_config(self):
         """Загружает конфигурацию из файла"""
         try:
-            if self._config_path.exists():
-                if self._config_path.suffix == ".toml":
+            # Без предварительной проверки exists: отсутствие файла — не ошибка
+            if self._config_path.suffix == ".toml":
+                if tomllib is not None:
+                    with open(self._config_path, "rb") as f:
+                        data = tomllib.load(f)
+                else:
                     data = toml.load(self._config_path)
-                    self._config = data.get("tool", {}).get("valutatrade", {})
-                elif self._config_path.suffix == ".json":
-                    with open(self._config_path, "r", encoding="utf-8") as f:
-                        self._config = json.load(f)
+                self._config = data.get("tool", {}).get("valutatrade", {})
+            elif self._config_path.suffix == ".json":
+                with open(self._config_path, "rb") as f:
+                    raw = f.read()
+                if orjson is not None:
+                    self._config = orjson.loads(raw)
+                else:
+                    self._config = json.loads(raw)
+        except FileNotFoundError:
+            self._config = {}
         except Exception as e:
-            print(f"Ошибка загрузки конфигурации: {e}")
+            logger.error("Ошибка загрузки конфигурации: %s", e)
             self._config = {}
 
         # Устанавливаем значения по умолчанию
@@ -55,6 +93,15 @@ class SettingsLoader(metaclass=Singleton):
             if key not in self._config:
                 self._config[key] = value
 
+        # Пути к файлам данных строятся один раз на загрузку конфигурации
+        data_dir = Path(self._config["data_dir"])
+        self._data_dir = data_dir
+        self._users_file = data_dir / "users.json"
+        self._portfolios_file = data_dir / "portfolios.json"
+        self._portfolios_journal_file = data_dir / "portfolios.journal.jsonl"
+        self._rates_file = data_dir / "rates.json"
+        self._exchange_rates_file = data_dir / "exchange_rates.jsonl"
+
     def get(self, key: str, default: Any = None) -> Any:
         """Возвращает значение конфигурации по ключу"""
         return self._config.get(key, default)
@@ -65,23 +112,27 @@ class SettingsLoader(metaclass=Singleton):
 
     @property
     def data_dir(self) -> Path:
-        return Path(self.get("data_dir", "data"))
+        return self._data_dir
 
     @property
     def users_file(self) -> Path:
-        return self.data_dir / "users.json"
+        return self._users_file
 
     @property
     def portfolios_file(self) -> Path:
-        return self.data_dir / "portfolios.json"
+        return self._portfolios_file
+
+    @property
+    def portfolios_journal_file(self) -> Path:
+        return self._portfolios_journal_file
 
     @property
     def rates_file(self) -> Path:
-        return self.data_dir / "rates.json"
+        return self._rates_file
 
     @property
     def exchange_rates_file(self) -> Path:
-        return self.data_dir / "exchange_rates.json"
+        return self._exchange_rates_file
 
     @property
     def rates_ttl_seconds(self) -> int:
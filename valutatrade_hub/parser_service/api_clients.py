@@ -2,6 +2,7 @@
 Клиенты для работы с внешними API
 """
 
+import math
 from abc import ABC, abstractmethod
 from typing import Dict
 
@@ -31,8 +32,9 @@ class CoinGeckoClient(BaseApiClient):
         # Подготавливаем параметры запроса
         crypto_ids = []
         for code in config.CRYPTO_CURRENCIES:
-            if code in config.CRYPTO_ID_MAP:
-                crypto_ids.append(config.CRYPTO_ID_MAP[code])
+            crypto_id = config.CRYPTO_ID_MAP.get(code)
+            if crypto_id is not None:
+                crypto_ids.append(crypto_id)
 
         if not crypto_ids:
             return {}
@@ -50,17 +52,22 @@ class CoinGeckoClient(BaseApiClient):
 
             # Преобразуем ответ в стандартный формат
             for code in config.CRYPTO_CURRENCIES:
-                if code in config.CRYPTO_ID_MAP:
-                    crypto_id = config.CRYPTO_ID_MAP[code]
-                    if crypto_id in data and "usd" in data[crypto_id]:
-                        pair = f"{code}_{config.BASE_CURRENCY}"
-                        rates[pair] = float(data[crypto_id]["usd"])
+                crypto_id = config.CRYPTO_ID_MAP.get(code)
+                if crypto_id is None:
+                    continue
+                price = data.get(crypto_id, {}).get("usd")
+                if price is None:
+                    continue
+                price = float(price)
+                # Нечисловой курс (NaN, inf) не попадает в rates.json
+                if math.isfinite(price):
+                    rates[f"{code}_{config.BASE_CURRENCY}"] = price
 
             return rates
 
         except requests.exceptions.RequestException as e:
             raise ApiRequestError(f"CoinGecko: {e}")
-        except (KeyError, ValueError, TypeError) as e:
+        except (AttributeError, KeyError, ValueError, TypeError) as e:
             raise ApiRequestError(f"CoinGecko: ошибка парсинга ответа - {e}")
 
 
@@ -93,11 +100,14 @@ class ExchangeRateApiClient(BaseApiClient):
             rates = {}
             base_code = data.get("base_code", config.BASE_CURRENCY)
 
+            api_rates = data.get("rates", {})
+
             for code in config.FIAT_CURRENCIES:
-                if code in data.get("rates", {}):
-                    if code != base_code:  # Не включаем базовую валюту
-                        pair = f"{code}_{base_code}"
-                        rates[pair] = float(data["rates"][code])
+                rate = api_rates.get(code)
+                if rate is not None and code != base_code:  # Без базовой валюты
+                    rate = float(rate)
+                    if math.isfinite(rate):
+                        rates[f"{code}_{base_code}"] = rate
 
             return rates
 
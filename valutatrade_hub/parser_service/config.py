@@ -63,7 +63,7 @@ class ParserConfig:
 
     @property
     def HISTORY_FILE_PATH(self) -> Path:
-        return Path("data/exchange_rates.json")
+        return Path("data/exchange_rates.jsonl")
 
     def validate(self):
         """Проверяет корректность конфигурации"""
@@ -2,24 +2,30 @@
 Операции с хранилищем данных
 """
 
-import json
+import logging
 from datetime import datetime
 from typing import Any, Dict, List
 
+from ..core.utils import (
+    append_json_line,
+    load_json_file,
+    load_json_lines,
+    migrate_json_history,
+    save_json_file,
+)
 from .config import config
 
+logger = logging.getLogger(__name__)
+
 
 class StorageManager:
     """Менеджер хранилища данных"""
 
     def load_rates(self) -> Dict[str, Any]:
         """Загружает текущие курсы из файла"""
-        try:
-            if config.RATES_FILE_PATH.exists():
-                with open(config.RATES_FILE_PATH, "r", encoding="utf-8") as f:
-                    return json.load(f)
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Ошибка загрузки rates.json: {e}")
+        data = load_json_file(config.RATES_FILE_PATH)
+        if data:
+            return data
 
         return {"pairs": {}, "last_refresh": None}
 
@@ -33,47 +39,26 @@ class StorageManager:
                 "source": rates_data.get("source", "ParserService"),
             }
 
-            # Сохраняем во временный файл, затем переименовываем
-            temp_path = config.RATES_FILE_PATH.with_suffix(".tmp")
-            with open(temp_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
-
-            temp_path.rename(config.RATES_FILE_PATH)
+            # Атомарная запись через временный файл (общая с core)
+            save_json_file(config.RATES_FILE_PATH, data)
             print(f"Сохранено {len(data['pairs'])} курсов в {config.RATES_FILE_PATH}")
 
         except Exception as e:
-            print(f"Ошибка сохранения rates.json: {e}")
+            logger.error("Ошибка сохранения rates.json: %s", e)
             raise
 
     def load_history(self) -> List[Dict[str, Any]]:
         """Загружает исторические данные"""
-        try:
-            if config.HISTORY_FILE_PATH.exists():
-                with open(config.HISTORY_FILE_PATH, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                    return data.get("history", [])
-        except (json.JSONDecodeError, IOError) as e:
-            print(f"Ошибка загрузки exchange_rates.json: {e}")
-
-        return []
+        migrate_json_history(config.HISTORY_FILE_PATH)
+        return load_json_lines(config.HISTORY_FILE_PATH)
 
     def save_to_history(self, rate_record: Dict[str, Any]):
-        """Сохраняет запись в исторические данные"""
+        """Дописывает запись в конец исторических данных"""
         try:
-            history = self.load_history()
-            history.append(rate_record)
-
-            data = {"history": history, "last_updated": datetime.now().isoformat()}
-
-            # Сохраняем во временный файл
-            temp_path = config.HISTORY_FILE_PATH.with_suffix(".tmp")
-            with open(temp_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
-
-            temp_path.rename(config.HISTORY_FILE_PATH)
-
+            migrate_json_history(config.HISTORY_FILE_PATH)
+            append_json_line(config.HISTORY_FILE_PATH, rate_record)
         except Exception as e:
-            print(f"Ошибка сохранения в историю: {e}")
+            logger.error("Ошибка сохранения в историю: %s", e)
             raise
 
     def create_rate_record(
@@ -71,17 +71,20 @@ class RatesUpdater:
             print("Не удалось получить ни одного курса")
             return {"success": False, "total_rates": 0, "last_refresh": None}
 
+        # Одна отметка времени на все обновление
+        refreshed_at = datetime.now().isoformat()
+
         # Формируем данные для сохранения
         rates_data = {
             "pairs": {},
-            "last_refresh": datetime.now().isoformat(),
+            "last_refresh": refreshed_at,
             "source": "ParserService",
         }
 
         for pair, rate in all_rates.items():
             rates_data["pairs"][pair] = {
                 "rate": rate,
-                "updated_at": datetime.now().isoformat(),
+                "updated_at": refreshed_at,
                 "source": "ParserService",
             }
 